@@ -1,4 +1,3 @@
-import textwrap
 import sys
 import textual
 from textual.app import App, ComposeResult
@@ -10,20 +9,26 @@ from textual.message import Message
 import textual.events
 from textual.events import Key
 from textual.screen import Screen
+from textual.worker import get_current_worker
 from textual.events import Paste
 import json
 import os
 from datetime import datetime
-from pdfminer.high_level import extract_text
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.converter import TextConverter
-from pdfminer.layout import LAParams
 from io import StringIO
-from pdfminer.pdfpage import PDFPage
 import time
 import asyncio
 import subprocess
+import mmap
+import threading
+import hashlib
+import pickle
+import tempfile
+import bisect
+from functools import lru_cache
+from operator import itemgetter
+from array import array
+from itertools import accumulate
+from collections import deque
 try:
     from vosk import Model, KaldiRecognizer
     import pyaudio
@@ -31,8 +36,20 @@ try:
     VOICE_AVAILABLE = True
 except ImportError:
     VOICE_AVAILABLE = False
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
 
 exts = ['.txt', '.md', '.pdf']
+ext_set = frozenset(exts)
+
+def file_ext(file_path):
+    return os.path.splitext(file_path)[1].lower()
 
 THEMES = {
     "dark": {
@@ -53,37 +70,155 @@ THEMES = {
 }
 
 bm_tolerance = 2
+_bookmark_scroll = itemgetter("scroll")
+_page_number = itemgetter("page")
 
 state_dir = os.path.join(os.path.expanduser("~"), ".reader_app")
 cache_dir = os.path.join(state_dir, "cache")
-os.makedirs(cache_dir, exist_ok=True)
+state_file = os.path.join(state_dir, "state.json")
+journal_file = os.path.join(state_dir, "state.jsonl")
+journal_limit = 64 * 1024
+_state_ready = False
+_STATE = None
+
+def _ensure_state():
+    global _state_ready
+    if _state_ready:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        with open(state_file, 'xb') as f:
+            f.write(b"{}")
+    except FileExistsError:
+        pass
+    _state_ready = True
+    compact_state()
 
 def cache_path(file_path):
+    _ensure_state()
     safe = (os.path.abspath(file_path).replace("\\", "_").replace("/", "_").replace(":", ""))
-    return os.path.join(cache_dir, safe + ".json")
+    return os.path.join(cache_dir, safe + ".pickle")
 
-if not os.path.exists(state_dir):
-    os.makedirs(state_dir)
-state_file = os.path.join(state_dir, "state.json")
-if not os.path.exists(state_file):
-    with open(state_file, 'w') as f:
-        json.dump({}, f)
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+def _read_all_bytes(path):
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        return os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def read_cache(path):
+    try:
+        return pickle.loads(_read_all_bytes(path))
+    except Exception:
+        return {}
+
+def write_cache(path, data):
+    _write_atomic(path, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+def _read_snapshot():
+    try:
+        return json_loads(_read_all_bytes(state_file))
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+def read_state():
+    state = _read_snapshot()
+    try:
+        journal = _read_all_bytes(journal_file)
+    except FileNotFoundError:
+        return state
+    for line in journal.splitlines():
+        try:
+            record = json_loads(line)
+        except ValueError:
+            continue
+        state[record["path"]] = record["data"]
+    return state
+
+def _state():
+    global _STATE
+    _ensure_state()
+    if _STATE is None:
+        _STATE = read_state()
+    return _STATE
+
+def write_state(state):
+    global _STATE
+    _ensure_state()
+    _write_atomic(state_file, json_dumps(state))
+    try:
+        os.remove(journal_file)
+    except FileNotFoundError:
+        pass
+    _STATE = state
+
+def compact_state():
+    if os.path.exists(journal_file):
+        write_state(_state())
+
+def _append_journal(key, data):
+    _ensure_state()
+    with open(journal_file, 'ab', buffering=65536) as f:
+        f.write(json_dumps({"path": key, "data": data}) + b"\n")
+        size = f.tell()
+    if size > journal_limit:
+        compact_state()
+
+_ts_cache = [0.0, ""]
+
+def _timestamp():
+    now = time.time()
+    if now - _ts_cache[0] > 1.0:
+        _ts_cache[:] = [now, datetime.fromtimestamp(now).isoformat()]
+    return _ts_cache[1]
 
 def scan_folder(folder_path):
     files = []
-    for root, dirs, filenames in os.walk(folder_path):
-        for filename in filenames:
-            if any(filename.lower().endswith(ext) for ext in exts):
-                files.append(os.path.join(root, filename))
+    stack = [folder_path]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif file_ext(entry.name) in ext_set:
+                            files.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
     return files
 
 
+def progress_percent(scroll, total):
+    if total is None or total <= 1:
+        return 0
+    return min(100, int(scroll / (total - 1) * 100))
+
 def build_library():
-    try:
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+    state = _state()
     
     library = []
     for path, data in state.items():
@@ -93,13 +228,14 @@ def build_library():
             continue
         scroll = data.get("scroll", 0)
         total = data.get("total_lines", 1)
+        name = os.path.basename(path)
+        progress = progress_percent(scroll, total)
         
-        if total is None or total <= 1:
-            progress = 0
-        else:
-            progress = min(100, int((scroll / max(total - 1, 1)) * 100))
         library.append({
             "path": path,
+            "name": name,
+            "name_lower": name.lower(),
+            "display": f"{name} - {progress}%" if progress < 100 else name,
             "scroll": scroll,
             "total_lines": total,
             "progress": progress,
@@ -110,271 +246,413 @@ def build_library():
     return library
 
 def load_theme():
-    try:
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        with open(state_file, 'w', encoding="utf-8") as f:
-            json.dump({}, f)
-        return THEMES["dark"]
-
-    theme_state = state.get("_theme", {})
+    theme_state = load_state("_theme")
     theme_name = theme_state.get("theme", "dark")
 
     return THEMES.get(theme_name, THEMES["dark"])
 
 
 def save_theme(theme_name):
-    try:
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        state = {}
-
-    if "_theme" not in state:
-        state["_theme"] = {}
-
-    state["_theme"]["theme"] = theme_name
-
-    with open(state_file, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+    theme_state = load_state("_theme")
+    theme_state["theme"] = theme_name
+    save_state("_theme", theme_state)
 
 
 def save_state(file_path, data):
-    try:
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        state = {}
-    
     if isinstance(data, int):
-        existing = state.get(file_path, {})
+        existing = load_state(file_path)
         existing["scroll"] = data
-        existing["timestamp"] = datetime.now().isoformat()
-        state[file_path] = existing
-    else:
-        state[file_path] = data
-    
-    with open(state_file, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=2)
+        existing["timestamp"] = _timestamp()
+        data = existing
+    _state()[file_path] = data
+    _append_journal(file_path, data)
 
 def load_state(file_path):
-    try:
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-        return state.get(file_path, {})
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+    return dict(_state().get(file_path, {}))
 
 def parse_toc(lines):
     toc = []
     for i, line in enumerate(lines):
+        if "#" not in line:
+            continue
         stripped = line.lstrip()
-        if stripped.startswith("#"):
-            level = len(stripped) - len(stripped.lstrip("#"))
-            title = stripped[level:].strip()
+        if stripped[:1] == "#":
+            title = stripped.lstrip("#")
+            level = len(stripped) - len(title)
+            title = title.strip()
             if title:
                 toc.append((i, level, title))
     return toc
 
 def load_text(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        c = f.read()
-    paras = c.split('\n\n')
-    return [p.strip() for p in paras if p.strip()]
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mm.find(b'\r') != -1:
+                text = mm[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                for para in text.split('\n\n'):
+                    para = para.strip()
+                    if para:
+                        yield para
+                return
+            pos = 0
+            while pos < size:
+                end = mm.find(b'\n\n', pos)
+                if end == -1:
+                    end = size
+                para = mm[pos:end].decode('utf-8').strip()
+                if para:
+                    yield para
+                pos = end + 2
+        finally:
+            mm.close()
+_WS_TABLE = str.maketrans("\n\x0b\x0c\r", "    ")
+
 def wrap_text(text, width=70):
-    return textwrap.wrap(text, width=width, replace_whitespace=False, drop_whitespace=False)
+    if len(text) <= width and text.isprintable() and text[:1] != " " and text[-1:] != " ":
+        return (text,) if text else ()
+    return _wrap_long(text, width)
+
+@lru_cache(maxsize=256)
+def _wrap_long(text, width):
+    text = text.expandtabs().translate(_WS_TABLE)
+    lines = []
+    start = 0
+    n = len(text)
+    while start < n:
+        while start < n and text[start] == " ":
+            start += 1
+        if n - start <= width:
+            if start < n:
+                lines.append(text[start:].rstrip(" "))
+            break
+        cut = text.rfind(" ", start, start + width + 1)
+        if cut > start:
+            word_end = text.find(" ", cut + 1)
+            if (n if word_end == -1 else word_end) - cut - 1 > width:
+                cut = -1
+        if cut <= start:
+            cut = nxt = start + width
+        else:
+            nxt = cut + 1
+        lines.append(text[start:cut].rstrip(" "))
+        start = nxt
+    return tuple(lines)
+
+def file_signature(file_path):
+    st = os.stat(file_path)
+    return (st.st_mtime_ns, st.st_size)
 
 def load_or_parse(file_path):
-    if file_path.endswith(".pdf"):
+    if file_ext(file_path) == ".pdf":
         return LazyPdfLoader(file_path)
     else:
         cpath = cache_path(file_path)
-        mtime = os.path.getmtime(file_path)
-        if os.path.exists(cpath):
-            with open(cpath, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if cached.get("mtime") == mtime and "paras" in cached:
-                return cached["paras"]
-        paras = load_text(file_path)
-        with open(cpath, "w", encoding="utf-8") as f:
-            json.dump({"mtime": mtime, "paras": paras}, f)
+        sig = file_signature(file_path)
+        cached = read_cache(cpath)
+        if cached.get("sig") == sig and "paras" in cached:
+            return cached["paras"]
+        paras = list(load_text(file_path))
+        write_cache(cpath, {"sig": sig, "paras": paras})
         return paras
 
+def wrap_paras(paras, width):
+    lines = deque()
+    extend = lines.extend
+    append = lines.append
+    for p in paras:
+        extend(wrap_text(p, width) or ("",))
+        append("")
+    return tuple(lines)
+
+def lines_cache_path(file_path, width):
+    _ensure_state()
+    mtime_ns, size = file_signature(file_path)
+    key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}-{mtime_ns}-{size}-{width}.lines")
+
+def evict_lines_cache(lpath):
+    prefix, sig = os.path.basename(lpath).rsplit("-", 1)[0].split("-", 1)
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith(prefix) and name.endswith((".lines", ".index")) and not name.startswith(f"{prefix}-{sig}-"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+def line_index(text):
+    lines = text.split("\n") if text else []
+    offsets = array('q', accumulate((len(line) + 1 for line in lines), initial=0))
+    para_starts = array('q', [0] if lines else [])
+    para_starts.extend(i + 1 for i, line in enumerate(lines) if not line and i + 1 < len(lines))
+    return {"offsets": offsets, "para_starts": para_starts}
+
+def load_or_wrap(file_path, paras, width):
+    lpath = lines_cache_path(file_path, width)
+    ipath = lpath[:-len(".lines")] + ".index"
+    index = read_cache(ipath)
+    if "offsets" in index:
+        try:
+            text = _read_all_bytes(lpath).decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            text = None
+        if text is not None and index["offsets"][-1] == (len(text) + 1 if text else 0):
+            return text, index
+    evict_lines_cache(lpath)
+    text = "\n".join(wrap_paras(paras, width))
+    _write_atomic(lpath, text.encode("utf-8"))
+    index = line_index(text)
+    write_cache(ipath, index)
+    return text, index
+
+_pdf_lock = threading.RLock()
+_pdf_backend = None
+
+def pdf_backend():
+    global _pdf_backend
+    if _pdf_backend is None:
+        try:
+            import pypdfium2
+            _pdf_backend = ("pdfium", pypdfium2)
+        except ImportError:
+            try:
+                import fitz
+                _pdf_backend = ("fitz", fitz)
+            except ImportError:
+                _pdf_backend = ("pdfminer", None)
+    return _pdf_backend
+
 class LazyPdfLoader:
     def __init__(self, file_path):
         self.file_path = file_path
         self.cpath = cache_path(file_path)
-        self.mtime = os.path.getmtime(file_path)
+        self.sig = file_signature(file_path)
+        self._doc = None
+        self._fp = None
+        self._backend, self._lib = pdf_backend()
         self.cache_data = self._load_cache()
         self.total_pages = self._count_pages()
         self.page_para_map = {}
+        self.page_starts = {}
+        self._page_offsets = array('q')
         self.current_max_para = 0
     def _load_cache(self):
-        if os.path.exists(self.cpath):
-            with open(self.cpath, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if cached.get("mtime") == self.mtime and "pages" in cached:
-                return cached
-        return {"mtime": self.mtime, "pages": {}, "total_pages": None}
+        cached = read_cache(self.cpath)
+        if cached.get("sig") == self.sig and "pages" in cached:
+            return cached
+        return {"sig": self.sig, "pages": {}, "total_pages": None}
     def _count_pages(self):
         if self.cache_data.get("total_pages"):
             return self.cache_data["total_pages"]
-        with open(self.file_path, 'rb') as fp:
-            total = len(list(PDFPage.get_pages(fp)))
-        self.cache_data["total_pages"] = total
-        self._save_cache()
+        with _pdf_lock:
+            if self._backend == "pdfium":
+                total = len(self._pdfium_doc())
+            elif self._backend == "fitz":
+                total = len(self._fitz_doc())
+            else:
+                total = len(self._pdfminer_pages())
+            self.cache_data["total_pages"] = total
+            self._save_cache()
         return total
     
+    def close(self):
+        with _pdf_lock:
+            if self._doc is not None and self._backend != "pdfminer":
+                self._doc.close()
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            self._doc = None
+    
     def _save_cache(self):
-        with open(self.cpath, "w", encoding="utf-8") as f:
-            json.dump(self.cache_data, f)
+        try:
+            write_cache(self.cpath, self.cache_data)
+        except OSError:
+            pass
+    
+    def _pdfium_doc(self):
+        if self._doc is None:
+            self._doc = self._lib.PdfDocument(self.file_path)
+        return self._doc
+    
+    def _fitz_doc(self):
+        if self._doc is None:
+            self._doc = self._lib.open(self.file_path)
+        return self._doc
+    
+    def _pdfminer_pages(self):
+        if self._doc is None:
+            from pdfminer.pdfpage import PDFPage
+            from pdfminer.pdfinterp import PDFResourceManager
+            self._fp = open(self.file_path, 'rb')
+            self._doc = list(PDFPage.get_pages(self._fp))
+            self._rmgr = PDFResourceManager(caching=True)
+        return self._doc
+    
+    def _page_text(self, page_num):
+        if self._backend == "pdfium":
+            page = self._pdfium_doc()[page_num - 1]
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+        if self._backend == "fitz":
+            return self._fitz_doc()[page_num - 1].get_text("text")
+        from pdfminer.pdfinterp import PDFPageInterpreter
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        pages = self._pdfminer_pages()
+        if page_num > len(pages):
+            return ""
+        output = StringIO()
+        device = TextConverter(self._rmgr, output, laparams=LAParams())
+        ctx = PDFPageInterpreter(self._rmgr, device)
+        ctx.process_page(pages[page_num - 1])
+        text = output.getvalue()
+        device.close()
+        output.close()
+        return text
     
     def _extract_page(self, page_num):
-        with open(self.file_path, 'rb') as fp:
-            rmgr = PDFResourceManager()
-            pages_iter = PDFPage.get_pages(fp)
-            
-            for i, page in enumerate(pages_iter, start=1):
-                if i == page_num:
-                    output = StringIO()
-                    device = TextConverter(rmgr, output, laparams=LAParams())
-                    ctx = PDFPageInterpreter(rmgr, device)
-                    ctx.process_page(page)
-                    text = output.getvalue()
-                    device.close()
-                    output.close()
-                    paras = []
-                    if text.strip():
-                        paras.append(f"--- Page {page_num} ---")
-                        lines = text.splitlines()
+        text = self._page_text(page_num)
+        paras = []
+        if text.strip():
+            paras.append(f"--- Page {page_num} ---")
+            lines = text.splitlines()
+            buffer = []
+            for line in lines:
+                stripped = line.strip()
+                if stripped:
+                    buffer.append(stripped)
+                else:
+                    if buffer:
+                        paras.append(" ".join(buffer))
                         buffer = []
-                        for line in lines:
-                            stripped = line.strip()
-                            if stripped:
-                                buffer.append(stripped)
-                            else:
-                                if buffer:
-                                    paras.append(" ".join(buffer))
-                                    buffer = []
-                        if buffer:
-                            paras.append(" ".join(buffer))
-                    return paras
-        return []
+            if buffer:
+                paras.append(" ".join(buffer))
+        return paras
     
-    def get_page(self, page_num):
+    def get_page(self, page_num, save=True):
         page_key = str(page_num)
-        if page_key not in self.cache_data["pages"]:
-            paras = self._extract_page(page_num)
-            self.cache_data["pages"][page_key] = paras
-            self._save_cache()
-        return self.cache_data["pages"][page_key]
+        pages = self.cache_data["pages"]
+        if page_key not in pages:
+            with _pdf_lock:
+                if page_key not in pages:
+                    try:
+                        pages[page_key] = self._extract_page(page_num)
+                    except Exception:
+                        pages[page_key] = []
+                    if save:
+                        self._save_cache()
+        return pages[page_key]
+    
+    def prefetch(self, cancelled):
+        try:
+            for page_num in range(1, self.total_pages + 1):
+                if cancelled():
+                    break
+                if str(page_num) in self.cache_data["pages"]:
+                    continue
+                self.get_page(page_num, save=False)
+                if page_num % 16 == 0:
+                    with _pdf_lock:
+                        self._save_cache()
+            with _pdf_lock:
+                self._save_cache()
+        finally:
+            self.close()
+    
+    def wrapped_line_count(self, width):
+        pages = self.cache_data["pages"]
+        return sum(max(1, len(wrap_text(para, width))) + 1
+                   for page_num in range(1, self.total_pages + 1)
+                   for para in pages.get(str(page_num), ()))
     
     def get_para(self, index):
-        for page_num in range(1, self.total_pages + 1):
-            if page_num not in self.page_para_map:
-                paras = self.get_page(page_num)
-                start = self.current_max_para
-                end = start+len(paras)
-                self.page_para_map[page_num] = (start, end)
-                self.current_max_para = end
-            start, end = self.page_para_map[page_num]
-            if start <= index < end:
-                paras = self.get_page(page_num)
-                local_idx = index - start
-                if local_idx < len(paras):
-                    return paras[local_idx]
-                return ""
-        return ""
-
-def extract_pdf_pages(lines):
-    pages = []
-    for i, line in enumerate(lines):
-        if line.startswith("--- Page ") and line.endswith(" ---"):
-            try:
-                page_num = int(line.split("Page ")[1].split(" ---")[0])
-                pages.append({
-                    "page": page_num,
-                    "scroll": i
-                })
-            except:
-                pass
-    return pages
+        while index >= self.current_max_para and len(self._page_offsets) < self.total_pages:
+            page_num = len(self._page_offsets) + 1
+            paras = self.get_page(page_num)
+            start = self.current_max_para
+            end = start+len(paras)
+            self.page_para_map[page_num] = (start, end)
+            self._page_offsets.append(start)
+            if paras:
+                self.page_starts[start] = page_num
+            self.current_max_para = end
+        if index >= self.current_max_para:
+            return ""
+        page_num = bisect.bisect_right(self._page_offsets, index)
+        return self.get_page(page_num)[index - self._page_offsets[page_num - 1]]
 
 
 class Reader:
-    def __init__(self, paras, width):
+    def __init__(self, paras, width, text=None, index=None):
         self.paras = paras
         self.width = width
         self.scroll = 0
         self.line_cache = {}
+        self._toc = None
         self.is_lazy_pdf = isinstance(paras, LazyPdfLoader)
-        self.para_offsets = self._build_offsets()
-    
-    def _build_offsets(self):
-        offsets = []
-        current = 0
-        para_count = len(self.paras) if not self.is_lazy_pdf else self.paras.total_pages * 10
-        
         if self.is_lazy_pdf:
             self.total_lines = None
-            return offsets
-        
-        for i in range(para_count):
-            if self.is_lazy_pdf:
-                p = self.paras[i]
-            else:
-                if i >= len(self.paras):
-                    break
-                p = self.paras[i]
-            wrapped = max(1, len(textwrap.wrap(p, self.width)))
-            offsets.append(current)
-            current += wrapped + 1
-        self.total_lines = current
-        return offsets
+        else:
+            self._text = text if text is not None else "\n".join(wrap_paras(paras, width))
+            index = index or line_index(self._text)
+            self._offsets = index["offsets"]
+            self.para_starts = index["para_starts"]
+            self.total_lines = len(self._offsets) - 1
     
     def _get_para(self, index):
-        if self.is_lazy_pdf:
-            if not hasattr(self, '_pcache'):
-                self._pcache = {}
-                self._poffs = {}
-                self._cline = 0
-                self._cpara = 0
-            while self._cline <= index:
-                if self._cpara not in self._pcache:
-                    try:
-                        para = self.paras.get_para(self._cpara)
-                        if not para:
-                            if self.total_lines is None:
-                                self.total_lines = self._cline
-                            break
-                        self._pcache[self._cpara] = para
-                        self._poffs[self._cpara] = self._cline
-                        wrapped_count = max(1, len(textwrap.wrap(para, self.width)))
-                        self._cline += wrapped_count + 1
-                        self._cpara += 1
-                    except:
+        if not hasattr(self, '_pcache'):
+            self._pcache = {}
+            self._poffs = {}
+            self._cline = 0
+            self._cpara = 0
+            self.pdf_pages = []
+            self._page_lines = array('q')
+        while self._cline <= index:
+            if self._cpara not in self._pcache:
+                try:
+                    para = self.paras.get_para(self._cpara)
+                    if not para:
                         if self.total_lines is None:
                             self.total_lines = self._cline
                         break
-                else:
-                    para = self._pcache[self._cpara]
-                    wrapped_count = max(1, len(textwrap.wrap(para, self.width)))
-                    self._cline += wrapped_count + 1
+                    self._pcache[self._cpara] = wrap_text(para, self.width)
+                    page_num = self.paras.page_starts.get(self._cpara)
+                    if page_num is not None:
+                        self.pdf_pages.append({"page": page_num, "scroll": self._cline})
+                        self._page_lines.append(self._cline)
+                    self._poffs[self._cpara] = self._cline
+                    self._cline += max(1, len(self._pcache[self._cpara])) + 1
                     self._cpara += 1
-            para_i = max((i for i, off in self._poffs.items() if off <= index), default=0)
-            return para_i, self._pcache.get(para_i, ""), self._poffs.get(para_i, 0)
-        else:
-            para_i = max((i for i, off in enumerate(self.para_offsets) if off <= index), default=0)
-            return para_i, self.paras[para_i], self.para_offsets[para_i]
+                except:
+                    if self.total_lines is None:
+                        self.total_lines = self._cline
+                    break
+            else:
+                self._cline += max(1, len(self._pcache[self._cpara])) + 1
+                self._cpara += 1
+        para_i = max((i for i, off in self._poffs.items() if off <= index), default=0)
+        return para_i, self._pcache.get(para_i, []), self._poffs.get(para_i, 0)
     
     def _line_from_index(self, index):
+        if not self.is_lazy_pdf:
+            if index >= self.total_lines:
+                return ""
+            return self._text[self._offsets[index]:self._offsets[index + 1] - 1]
         if index in self.line_cache:
             return self.line_cache[index]
         
-        para_i, para_text, start = self._get_para(index)
+        para_i, wrapped, start = self._get_para(index)
         local = index - start
-        wrapped = textwrap.wrap(para_text, self.width) if para_text else []
         
         if local < len(wrapped):
             line = wrapped[local]
@@ -384,6 +662,20 @@ class Reader:
         self.line_cache[index] = line
         return line
     
+    def get_toc(self):
+        if self._toc is None:
+            self._toc = parse_toc(self._text.split("\n")) if not self.is_lazy_pdf else []
+        return self._toc
+    
+    def get_pdf_pages(self, limit):
+        self._get_para(limit)
+        return [p for p in self.pdf_pages if p["scroll"] < limit]
+    
+    def page_at(self, index):
+        self._get_para(index)
+        i = bisect.bisect_right(self._page_lines, index) - 1
+        return self.pdf_pages[i]["page"] if i >= 0 else 1
+    
     def get_visible_lines(self, height):
         lines = []
         if self.total_lines is not None:
@@ -398,6 +690,27 @@ class Reader:
                 break
         return lines
 
+    def scroll_paragraph(self, step):
+        if self.is_lazy_pdf:
+            return
+        starts = self.para_starts
+        if step > 0:
+            i = bisect.bisect_right(starts, self.scroll)
+            if i < len(starts):
+                self.scroll = starts[i]
+        else:
+            i = bisect.bisect_left(starts, self.scroll) - 1
+            if i >= 0:
+                self.scroll = starts[i]
+
+    def get_visible_text(self, height):
+        if self.is_lazy_pdf:
+            return "\n".join(self.get_visible_lines(height))
+        end = min(self.scroll + height, self.total_lines)
+        if end <= self.scroll:
+            return ""
+        return self._text[self._offsets[self.scroll]:self._offsets[end] - 1]
+
 max_width = 70
 
 class ReadingView(Static):
@@ -418,6 +731,8 @@ class ReaderApp(App):
     BINDINGS = [
         ("j", "scroll_down", "Scroll Down"),
         ("k", "scroll_up", "Scroll Up"),
+        ("J", "next_paragraph", "Next Paragraph"),
+        ("K", "prev_paragraph", "Previous Paragraph"),
         ("q", "quit", "Quit"),
         ("t", "toc", "Table of Contents"),
         ("b", "bookmark", "Bookmark"),
@@ -432,6 +747,7 @@ class ReaderApp(App):
     def __init__(self, file_path: str | None = None):
         super().__init__()
         self.file_path = file_path
+        self._ext = file_ext(file_path) if file_path else ""
         self.reader: Reader = None
         self.view: ReadingView = None
         self._scroll_speed = 1
@@ -440,8 +756,14 @@ class ReaderApp(App):
         self._voice_worker = None
         self._auto_scroll_active = False
         self._auto_scroll_speed = 1
+        self._rendered = None
+        self._shown = None
+        self._pending_delta = 0
+        self._scroll_timer = None
+        self._view_height = 0
+        self._dirty_scroll = False
     def compose(self):
-        yield ReadingView(id="reader-view")
+        yield ReadingView(id="reader-view", markup=False)
     def apply_theme(self):
         theme = getattr(self, "_current_theme", None)
         if theme:
@@ -454,6 +776,8 @@ class ReaderApp(App):
     def on_mount(self):
         self._current_theme = load_theme()
         self.view = self.query_one(ReadingView)
+        self._update = self.view.update
+        self.set_interval(5.0, self._flush_scroll_state)
         self.apply_theme()
         if not self.file_path:
             self.action_library()
@@ -478,17 +802,46 @@ class ReaderApp(App):
         else:
             start_scroll = 0
         self._load_file_internal(start_scroll)
+    def _render_lines(self, height):
+        reader = self.reader
+        scroll = reader.scroll
+        full = height > 1 and (reader.total_lines is None or scroll + height <= reader.total_lines)
+        if full and self._rendered is not None:
+            prev_reader, prev_scroll, prev_height, text = self._rendered
+            if prev_reader is reader and prev_height == height:
+                if scroll == prev_scroll:
+                    return text
+                if scroll == prev_scroll + 1:
+                    text = text[text.index("\n") + 1:] + "\n" + reader._line_from_index(scroll + height - 1)
+                    self._rendered = (reader, scroll, height, text)
+                    return text
+                if scroll == prev_scroll - 1:
+                    text = reader._line_from_index(scroll) + "\n" + text[:text.rindex("\n")]
+                    self._rendered = (reader, scroll, height, text)
+                    return text
+        text = reader.get_visible_text(height)
+        self._rendered = (reader, scroll, height, text) if full else None
+        return text
+
+    def on_resize(self, event: textual.events.Resize):
+        self._view_height = event.size.height - 2
+        self.update_view()
+
     def update_view(self):
         if self.reader and self.view:
-            height = self.size.height - 2
-            visible_lines = self.reader.get_visible_lines(height)
-            content = "\n".join(visible_lines)
+            height = self._view_height or self.size.height - 2
+            content = self._render_lines(height)
             if self._voice_active:
                 indicator = "[🎙 VOICE]" if self._auto_scroll_active else "[🎙 voice]"
                 content = f"{indicator}\n{content}"
-            self.view.update(content)
+            if content is not self._shown:
+                self._shown = content
+                self._update(content)
+    def _reading_active(self):
+        return self.reader is not None and len(self.screen_stack) == 1
+
     def action_scroll_down(self):
-        if not self.reader:
+        if not self._reading_active():
             return
         t = time.time()
         if t - self._last_scroll_time < 0.3:
@@ -496,19 +849,10 @@ class ReaderApp(App):
         else:
             self._scroll_speed = 1
         self._last_scroll_time = t
-        
-        if self.reader.total_lines is not None:
-            self.reader.scroll = min(
-                self.reader.scroll + self._scroll_speed,
-                self.reader.total_lines - 1
-            )
-        else:
-            self.reader.scroll += self._scroll_speed
-        self.update_view()
-        self._save_scroll_position()
+        self._queue_scroll(self._scroll_speed)
 
     def action_scroll_up(self):
-        if not self.reader:
+        if not self._reading_active():
             return
         t = time.time()
         if t - self._last_scroll_time < 0.3:
@@ -516,32 +860,62 @@ class ReaderApp(App):
         else:
             self._scroll_speed = 1
         self._last_scroll_time = t
-        
-        self.reader.scroll = max(self.reader.scroll - self._scroll_speed, 0)
+        self._queue_scroll(-self._scroll_speed)
+
+    def _queue_scroll(self, delta):
+        self._pending_delta += delta
+        if self._scroll_timer is None:
+            self._scroll_timer = self.set_timer(0.016, self._flush_scroll)
+
+    def _flush_scroll(self):
+        self._scroll_timer = None
+        delta, self._pending_delta = self._pending_delta, 0
+        if not self.reader or not delta:
+            return
+        scroll = max(self.reader.scroll + delta, 0)
+        if self.reader.total_lines is not None:
+            scroll = min(scroll, max(self.reader.total_lines - 1, 0))
+        self.reader.scroll = scroll
+        self.update_view()
+        self._save_scroll_position()
+
+    def action_next_paragraph(self):
+        if not self._reading_active():
+            return
+        self._flush_scroll()
+        self.reader.scroll_paragraph(1)
+        self.update_view()
+        self._save_scroll_position()
+
+    def action_prev_paragraph(self):
+        if not self._reading_active():
+            return
+        self._flush_scroll()
+        self.reader.scroll_paragraph(-1)
         self.update_view()
         self._save_scroll_position()
 
     def _save_scroll_position(self):
+        self._dirty_scroll = True
+
+    def _flush_scroll_state(self):
+        if not self._dirty_scroll:
+            return
+        self._dirty_scroll = False
         if not self.file_path or not self.reader:
             return
-        if not hasattr(self, '_scroll_count'):
-            self._scroll_count = 0
-        self._scroll_count += 1
-        if self._scroll_count >= 10:
-            self._scroll_count = 0
-            state = load_state(self.file_path)
-            state["scroll"] = self.reader.scroll
-            state["total_lines"] = self.reader.total_lines
-            state["timestamp"] = datetime.now().isoformat()
-            save_state(self.file_path, state)
+        state = load_state(self.file_path)
+        state["scroll"] = self.reader.scroll
+        state["total_lines"] = self.reader.total_lines
+        state["timestamp"] = _timestamp()
+        save_state(self.file_path, state)
 
     def action_toc(self):
-        if not self.file_path or not self.file_path.endswith(".md"):
+        if not self.reader or not self.file_path or self._ext != ".md":
             return
-        if self.reader.total_lines is None:
+        if self.reader.is_lazy_pdf:
             return
-        all_lines = [self.reader._line_from_index(i) for i in range(self.reader.total_lines)]
-        toc = parse_toc(all_lines)
+        toc = self.reader.get_toc()
         if not toc:
             return
 
@@ -551,41 +925,32 @@ class ReaderApp(App):
         )
 
     def action_bookmark(self):
-        if not self.file_path:
+        if not self.reader or not self.file_path:
             return
         data = load_state(self.file_path)
-        bookmarks = data.get("bookmarks", [])
+        bookmarks = sorted(data.get("bookmarks", []), key=_bookmark_scroll)
         
-        if self.file_path.endswith(".pdf"):
-            page_num = 1
-            for i in range(self.reader.scroll, -1, -1):
-                line = self.reader._line_from_index(i)
-                if line.startswith("--- Page ") and line.endswith(" ---"):
-                    page_num = int(line.split("Page ")[1].split(" ---")[0])
-                    break
-            preview = f"Page {page_num}"
+        if self.reader.is_lazy_pdf:
+            preview = f"Page {self.reader.page_at(self.reader.scroll)}"
         else:
             preview = self.reader._line_from_index(self.reader.scroll)[:50]
 
-        for bm in bookmarks:
-            if abs(bm["scroll"] - self.reader.scroll) <= bm_tolerance:
-                bm["scroll"] = self.reader.scroll
-                bm["preview"] = preview
-                data["bookmarks"] = bookmarks
-                data["scroll"] = self.reader.scroll
-                data["timestamp"] = datetime.now().isoformat()
-                save_state(self.file_path, data)
-                return
-        bookmarks.append({
-            "scroll": self.reader.scroll,
+        scroll = self.reader.scroll
+        i = bisect.bisect_left(bookmarks, scroll, key=_bookmark_scroll)
+        near = min((j for j in (i - 1, i) if 0 <= j < len(bookmarks)),
+                   key=lambda j: abs(bookmarks[j]["scroll"] - scroll), default=None)
+        if near is not None and abs(bookmarks[near]["scroll"] - scroll) <= bm_tolerance:
+            bookmarks.pop(near)
+        bisect.insort(bookmarks, {
+            "scroll": scroll,
             "preview": preview,
-        })
+        }, key=_bookmark_scroll)
         data["bookmarks"] = bookmarks
         data["scroll"] = self.reader.scroll
-        data["timestamp"] = datetime.now().isoformat()
+        data["timestamp"] = _timestamp()
         save_state(self.file_path, data)
     def action_show_bookmarks(self):
-        if not self.file_path:
+        if not self.reader or not self.file_path:
             return
         data = load_state(self.file_path)
         bookmarks = data.get("bookmarks", [])
@@ -597,27 +962,13 @@ class ReaderApp(App):
         )
 
     def action_pages(self):
-        if not self.file_path or not self.file_path.endswith(".pdf"):
+        if not self.reader or not self.file_path or self._ext != ".pdf":
             return
         
         # For PDFs, extract page markers from visible content
         if isinstance(self.reader.paras, LazyPdfLoader):
-            pages = []
-            page_num = 1
-            scroll_pos = 0
-            # Scan through loaded pages to find page markers
-            for para_idx in range(self.reader.paras.total_pages * 10):
-                try:
-                    line = self.reader._line_from_index(scroll_pos)
-                    if line.startswith("--- Page ") and line.endswith(" ---"):
-                        try:
-                            page_num = int(line.split("Page ")[1].split(" ---")[0])
-                            pages.append({"page": page_num, "scroll": scroll_pos})
-                        except:
-                            pass
-                    scroll_pos += 1
-                except:
-                    break
+            # Page markers are recorded as paragraphs are wrapped
+            pages = self.reader.get_pdf_pages(self.reader.paras.total_pages * 10)
             
             if not pages:
                 return
@@ -725,15 +1076,14 @@ class ReaderApp(App):
                 )
             else:
                 self.reader.scroll += self._auto_scroll_speed
+            self._dirty_scroll = True
             self.update_view()
             await asyncio.sleep(0.1)
     def action_library(self):
         if self.reader and self.file_path:
-            state = load_state(self.file_path)
-            state["scroll"] = self.reader.scroll
-            state["total_lines"] = self.reader.total_lines
-            state["timestamp"] = datetime.now().isoformat()
-            save_state(self.file_path, state)
+            self._flush_scroll()
+            self._dirty_scroll = True
+            self._flush_scroll_state()
         
         library = build_library()
         self.push_screen(
@@ -791,20 +1141,85 @@ class ReaderApp(App):
             self._load_file(result)
     
     def _load_file_internal(self, start_scroll):
-        paras = load_or_parse(self.file_path)
-        
-        self.reader = Reader(paras=paras, width=max_width)
-        self.reader.scroll = start_scroll
+        self._pending_delta = 0
+        self._dirty_scroll = False
+        self.reader = None
+        self._rendered = None
+        self._shown = None
+        self._update(f"Loading {os.path.basename(self.file_path)}...")
+        file_path = self.file_path
+        height = self._view_height or self.size.height - 2
+        self.run_worker(lambda: self._parse_file(file_path, start_scroll, height), thread=True, exclusive=True, group="load")
+    
+    def _parse_file(self, file_path, start_scroll, height):
+        worker = get_current_worker()
+        ext = file_ext(file_path)
+        if start_scroll == 0 and height > 0 and ext != ".pdf" and not os.path.exists(lines_cache_path(file_path, max_width)):
+            preview = []
+            for para in load_text(file_path):
+                preview.extend(wrap_text(para, max_width) or [""])
+                preview.append("")
+                if len(preview) >= height:
+                    break
+            self.call_from_thread(self._show_preview, file_path, "\n".join(preview[:height]))
+        paras = load_or_parse(file_path)
+        text, index = (None, None) if isinstance(paras, LazyPdfLoader) else load_or_wrap(file_path, paras, max_width)
+        reader = Reader(paras=paras, width=max_width, text=text, index=index)
+        reader.scroll = start_scroll
+        if reader.is_lazy_pdf:
+            reader.get_visible_lines(height)
+        elif ext == ".md":
+            reader.get_toc()
+        if not worker.is_cancelled:
+            self.call_from_thread(self._finish_load, file_path, reader)
+        elif reader.is_lazy_pdf:
+            paras.close()
+    
+    def _show_preview(self, file_path, text):
+        if file_path == self.file_path and self.reader is None:
+            self._update(text)
+    
+    def _finish_load(self, file_path, reader):
+        if file_path != self.file_path:
+            if reader.is_lazy_pdf:
+                reader.paras.close()
+            return
+        self.reader = reader
+        paras = reader.paras
         
         state = load_state(self.file_path)
         state["total_lines"] = self.reader.total_lines
-        state["timestamp"] = datetime.now().isoformat()
+        state["timestamp"] = _timestamp()
         save_state(self.file_path, state)
         
         self.update_view()
+        if self.reader.is_lazy_pdf:
+            self.run_worker(lambda: self._stream_pdf_pages(paras, reader.width), thread=True, exclusive=True, group="pdf")
+    
+    def _stream_pdf_pages(self, loader, width):
+        worker = get_current_worker()
+        cancelled = lambda: worker.is_cancelled or self.reader is None or self.reader.paras is not loader
+        loader.prefetch(cancelled)
+        if cancelled():
+            return
+        total_lines = loader.wrapped_line_count(width)
+        if not cancelled():
+            self.call_from_thread(self._pdf_ready, loader, total_lines)
+    
+    def _pdf_ready(self, loader, total_lines):
+        reader = self.reader
+        if reader is None or reader.paras is not loader or reader.total_lines is not None:
+            return
+        reader.total_lines = total_lines
+        self._dirty_scroll = True
+        self._rendered = None
+        self.update_view()
     
     def _load_file(self, file_path):
+        self._flush_scroll()
+        self._flush_scroll_state()
         self.file_path = file_path
+        self._ext = file_ext(file_path)
         
         saved_state = load_state(self.file_path)
         saved_scroll = saved_state.get("scroll", 0)
@@ -825,34 +1240,25 @@ class ReaderApp(App):
             path = path.replace("'", "'").replace("'", "'")
             if not os.path.isfile(path):
                 return f"Not a file: {os.path.basename(path)}"
-            if not any(path.lower().endswith(ext) for ext in exts):
+            if file_ext(path) not in ext_set:
                 return f"Unsupported file type: {os.path.basename(path)}"
             state = load_state(path)
             if state and state.get("timestamp"):
                 return True
-            paras = load_or_parse(path)
-            temp_reader = Reader(paras=paras, width=max_width)
             state = {
                 "scroll": 0,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _timestamp(),
                 "bookmarks": [],
-                "total_lines": temp_reader.total_lines
+                "total_lines": None,
             }
             save_state(path, state)
             return True
         except Exception as e:
             return f"Error: {str(e)[:50]}"
     def _rewrite_library(self, library):
-        with open(state_file, "r") as f:
-            state = json.load(f)
-
         keep = {item["path"] for item in library}
-        for key in list(state.keys()):
-            if key not in keep and key != "_global":
-                state.pop(key, None)
-
-        with open(state_file, "w") as f:
-            json.dump(state, f, indent=2)
+        state = {k: v for k, v in _state().items() if k in keep or k.startswith("_")}
+        write_state(state)
         
         
     def _handle_theme_selection(self, theme_name: str | None):
@@ -862,13 +1268,15 @@ class ReaderApp(App):
             self.apply_theme()
 
     def action_quit(self):
+        self._flush_scroll()
+        self._dirty_scroll = False
         self._voice_active = False
         self._auto_scroll_active = False
         if self.reader and self.file_path:
             state = load_state(self.file_path)
             state["scroll"] = self.reader.scroll
             state["total_lines"] = self.reader.total_lines
-            state["timestamp"] = datetime.now().isoformat()
+            state["timestamp"] = _timestamp()
             save_state(self.file_path, state)
         self.exit()
     
@@ -888,6 +1296,7 @@ class ReaderApp(App):
     def _handle_toc_jump(self, line: int | None):
         if line is not None:
             self.reader.scroll = line
+            self._dirty_scroll = True
             self.update_view()
 
 
@@ -913,11 +1322,15 @@ class ThemeSelector(Screen):
     def compose(self):
         with Vertical(id="box"):
             yield Static("Select Theme\n")
+            self._items = []
+            self._selected = self.selected_index
             for i, theme_name in enumerate(THEMES.keys()):
-                yield Static(
+                item = Static(
                     theme_name.capitalize(),
                     classes="selected" if i == self.selected_index else ""
                 )
+                self._items.append(item)
+                yield item
     def on_key(self, event: Key):
         if event.key == "up":
             old_index = self.selected_index
@@ -936,12 +1349,9 @@ class ThemeSelector(Screen):
             self.dismiss(None)
     
     def _update_selection(self):
-        statics = self.query(Static)
-        for i, static in enumerate(list(statics)[1:]):
-            if i == self.selected_index:
-                static.add_class("selected")
-            else:
-                static.remove_class("selected")
+        self._items[self._selected].remove_class("selected")
+        self._items[self.selected_index].add_class("selected")
+        self._selected = self.selected_index
 
 class VoiceSetupScreen(Screen):
     CSS = """
@@ -1132,21 +1542,25 @@ class PdfPageScreen(Screen):
     def compose(self):
         with Vertical(id="box"):
             yield Static("Pages (Type page number and press Enter to jump)\n")
+            self._items = []
+            self._selected = self.index
             for i, item in enumerate(self.pages):
-                yield Static(
+                row = Static(
                     f"Page {item['page']}",
                     classes="selected" if i == self.index else ""
                 )
+                self._items.append(row)
+                yield row
     def on_key(self, event: Key):
         if self.input_mode:
             if event.key == "enter":
                 if self.buffer:
                     try:
                         page_num = int(self.buffer)
-                        for p in self.pages:
-                            if p["page"] == page_num:
-                                self.dismiss(p["scroll"])
-                                return
+                        i = bisect.bisect_left(self.pages, page_num, key=_page_number)
+                        if i < len(self.pages) and self.pages[i]["page"] == page_num:
+                            self.dismiss(self.pages[i]["scroll"])
+                            return
                     except ValueError:
                         pass
                 self._exit_input_mode()
@@ -1161,12 +1575,12 @@ class PdfPageScreen(Screen):
                     title.update(f"Pages - Enter page: {self.buffer}")
                 else:
                     self._exit_input_mode()
-            elif len(event.key) == 1 and event.key in "0123456789":
+            elif len(event.key) == 1 and event.key.isdecimal():
                 self.buffer += event.key
                 title = self.query_one(Static)
                 title.update(f"Pages - Enter page: {self.buffer}")
             return
-        if len(event.key) == 1 and event.key in "0123456789":
+        if len(event.key) == 1 and event.key.isdecimal():
             self.input_mode = True
             self.buffer = event.key
             title = self.query_one(Static)
@@ -1182,12 +1596,11 @@ class PdfPageScreen(Screen):
         elif event.key.lower() == "q":
             self.dismiss(None)
     def _update_selection(self):
-        statics = self.query(Static)
-        for i, static in enumerate(list(statics)[1:]):
-            if i == self.index:
-                static.add_class("selected")
-            else:
-                static.remove_class("selected")
+        if self._selected < len(self._items):
+            self._items[self._selected].remove_class("selected")
+        if self.index < len(self._items):
+            self._items[self.index].add_class("selected")
+        self._selected = self.index
     def _exit_input_mode(self):
         self.input_mode = False
         self.buffer = ""
@@ -1214,11 +1627,7 @@ class ResumePrompt(Screen):
         self.scroll = scroll['scroll'] if isinstance(scroll, dict) else scroll
         self.total_lines = total_lines
         self.file_name = os.path.basename(file_path)
-        
-        if total_lines is None or total_lines <= 1:
-            self.progress = 0
-        else:
-            self.progress = int((self.scroll / max(total_lines - 1, 1)) * 100)
+        self.progress = progress_percent(self.scroll, total_lines)
 
     def compose(self):
         yield Vertical(
@@ -1261,12 +1670,16 @@ class TocScreen(Screen):
     def compose(self):
         with Vertical(id="box"):
             yield Static("Table of Contents\n")
+            self._items = []
+            self._selected = self.index
             for i, item in enumerate(self.toc):
                 indent = "  " * (item[1] - 1)
-                yield Static(
+                row = Static(
                     f"{indent}{item[2]}",
                     classes="selected" if i == self.index else ""
                 )
+                self._items.append(row)
+                yield row
     def on_key(self, event: Key):
         if event.key == "up":
             old_index = self.index
@@ -1284,12 +1697,11 @@ class TocScreen(Screen):
             self.dismiss(None)
     
     def _update_selection(self):
-        statics = self.query(Static)
-        for i, static in enumerate(list(statics)[1:]):
-            if i == self.index:
-                static.add_class("selected")
-            else:
-                static.remove_class("selected")
+        if self._selected < len(self._items):
+            self._items[self._selected].remove_class("selected")
+        if self.index < len(self._items):
+            self._items[self.index].add_class("selected")
+        self._selected = self.index
     
 class BookmarkScreen(Screen):
     CSS = """
@@ -1316,11 +1728,15 @@ class BookmarkScreen(Screen):
     def compose(self):
         with Vertical(id="box"):
             yield Static("Bookmarks\n")
+            self._items = []
+            self._selected = self.index
             for i, bm in enumerate(self.bookmarks):
-                yield Static(
+                row = Static(
                     f"{i+1}. {bm['preview']}",
                     classes="selected" if i == self.index else ""
                 )
+                self._items.append(row)
+                yield row
     def on_key(self, event: Key):
         if event.key == "up":
             old_index = self.index
@@ -1343,31 +1759,24 @@ class BookmarkScreen(Screen):
                 if len(self.bookmarks) == 0:
                     self.dismiss(None)
                 else:
-                    if self.index >= len(self.bookmarks):
-                        self.index = len(self.bookmarks) - 1
-                    self._rebuild_list()
+                    self._remove_row(self.index)
         elif event.key.lower() == "q":
             self.dismiss(None)
     
     def _update_selection(self):
-        statics = self.query(Static)
-        for i, static in enumerate(list(statics)[1:]):
-            if i == self.index:
-                static.add_class("selected")
-            else:
-                static.remove_class("selected")
-
-    def _rebuild_list(self):
-        container = self.query_one("#box")
-        statics = list(container.query(Static))
-        for static in statics[1:]:
-            static.remove()
-        for i, bm in enumerate(self.bookmarks):
-            new_static = Static(
-                f"{i+1}. {bm['preview']}",
-                classes="selected" if i == self.index else ""
-            )
-            container.mount(new_static)
+        if self._selected < len(self._items):
+            self._items[self._selected].remove_class("selected")
+        if self.index < len(self._items):
+            self._items[self.index].add_class("selected")
+        self._selected = self.index
+
+    def _remove_row(self, row):
+        self._items.pop(row).remove()
+        for i in range(row, len(self._items)):
+            self._items[i].update(f"{i+1}. {self.bookmarks[i]['preview']}")
+        self.index = min(self.index, len(self._items) - 1)
+        self._items[self.index].add_class("selected")
+        self._selected = self.index
 
 class LibraryScreen(Screen):
     CSS = """
@@ -1395,6 +1804,9 @@ class LibraryScreen(Screen):
         self.search_mode = False
         self.search_buffer = ""
         self.filtered_library = library
+        self._search_cache = {}
+        self._name_blob = None
+        self._search_timer = None
         self.status_msg = status_msg
         self.success_count = success_count
     def compose(self):
@@ -1405,12 +1817,35 @@ class LibraryScreen(Screen):
             elif self.success_count > 0:
                 title_text = f"✓ Added {self.success_count} file(s)\n"
             yield Static(title_text, id="title")
-            for i, item in enumerate(self.filtered_library):
-                progress = f" - {item['progress']}%" if item['progress'] < 100 else ""
-                yield Static(
-                    f"{os.path.basename(item['path'])}{progress}",
+            self._items = []
+            self._selected = self.index
+            self._item_texts = []
+            self._window_start = 0
+            self._window_size = max(1, self.app.size.height * 4 // 5 - 6)
+            for i, text in enumerate(self._window_texts()):
+                row = Static(
+                    text,
                     classes="selected" if i == self.index else ""
                 )
+                self._items.append(row)
+                self._item_texts.append(text)
+                yield row
+    def _window_texts(self):
+        end = self._window_start + self._window_size
+        return [item["display"] for item in self.filtered_library[self._window_start:end]]
+    def _move_window(self):
+        if self.index < self._window_start:
+            self._window_start = self.index
+        elif self.index >= self._window_start + self._window_size:
+            self._window_start = self.index - self._window_size + 1
+        else:
+            return False
+        return True
+    def on_resize(self, event: textual.events.Resize):
+        size = max(1, event.size.height * 4 // 5 - 6)
+        if size != self._window_size:
+            self._window_size = size
+            self._rebuild_list()
     def on_paste(self, event: textual.events.Paste):
         if self.input_mode:
             self.buffer += event.text
@@ -1423,8 +1858,9 @@ class LibraryScreen(Screen):
                 return
             elif event.key in ("escape",):
                 self.search_buffer = ""
-                self.filtered_library = self.library
                 self._exit_search_mode()
+                if self.filtered_library is not self.library:
+                    self._apply_search()
                 return
             elif event.key == "backspace":
                 self.search_buffer = self.search_buffer[:-1]
@@ -1467,7 +1903,7 @@ class LibraryScreen(Screen):
             self._update_selection()
 
         elif event.key == "down":
-            self.index = min(len(self.filtered_library) - 1, self.index + 1)
+            self.index = max(0, min(len(self.filtered_library) - 1, self.index + 1))
             self._update_selection()
 
         elif event.key == "enter":
@@ -1482,12 +1918,16 @@ class LibraryScreen(Screen):
         elif event.key == "q" or event.key == "escape":
             self.dismiss(None)
     def _update_selection(self):
-        statics = self.query(Static)
-        for i, static in enumerate(list(statics)[1:]):
-            if i == self.index:
-                static.add_class("selected")
-            else:
-                static.remove_class("selected")
+        if self._move_window():
+            self._rebuild_list()
+            return
+        old = self._selected - self._window_start
+        if 0 <= old < len(self._items):
+            self._items[old].remove_class("selected")
+        new = self.index - self._window_start
+        if new < len(self._items):
+            self._items[new].add_class("selected")
+        self._selected = self.index
     def _enter_input_mode(self, mode):
         self.input_mode = mode
         self.buffer = ""
@@ -1509,34 +1949,74 @@ class LibraryScreen(Screen):
         title = self.query_one("#title", Static)
         title.update("Library - Search: ")
     def _exit_search_mode(self):
+        if self._search_timer is not None:
+            self._search_timer.stop()
+            self._apply_search()
         self.search_mode = False
         title = self.query_one("#title", Static)
         title.update("Library  (A=add file, F=add folder, /=search)\n")
     def _update_search(self):
         title = self.query_one("#title", Static)
         title.update(f"Library - Search: {self.search_buffer}")
+        if self._search_timer is not None:
+            self._search_timer.stop()
+        self._search_timer = self.set_timer(0.05, self._apply_search)
+    def _apply_search(self):
+        self._search_timer = None
         if self.search_buffer:
             q = self.search_buffer.lower()
-            self.filtered_library = [
-                item for item in self.library
-                if q in os.path.basename(item["path"]).lower()
-            ]
+            matches = self._search_cache.get(q)
+            if matches is None:
+                pool = None
+                for n in range(len(q) - 1, 0, -1):
+                    pool = self._search_cache.get(q[:n])
+                    if pool is not None:
+                        break
+                if pool is None:
+                    matches = self._match_all(q)
+                else:
+                    matches = [item for item in pool if q in item["name_lower"]]
+                self._search_cache[q] = matches
+            self.filtered_library = matches
         else:
             self.filtered_library = self.library
         self.index = 0
+        self._window_start = 0
         self._rebuild_list()
+    def _match_all(self, q):
+        if self._name_blob is None:
+            names = [item["name_lower"] for item in self.library]
+            self._name_blob = "\n".join(names)
+            self._name_starts = array('q', accumulate((len(name) + 1 for name in names), initial=0))
+        matches = []
+        find = self._name_blob.find
+        starts = self._name_starts
+        pos = find(q)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            matches.append(self.library[i])
+            pos = find(q, starts[i + 1])
+        return matches
     def _rebuild_list(self):
         container = self.query_one("#box")
-        statics = list(container.query(Static))
-        for static in statics[1:]:
+        self._move_window()
+        texts = self._window_texts()
+        for i, text in enumerate(texts[:len(self._items)]):
+            if self._item_texts[i] != text:
+                self._items[i].update(text)
+                self._item_texts[i] = text
+        for static in self._items[len(texts):]:
             static.remove()
-        for i, item in enumerate(self.filtered_library):
-            progress = f"{item['progress']}%" if item['progress'] < 100 else ""
-            new_static = Static(
-                f"{os.path.basename(item['path'])} {progress}".strip(),
-                classes="selected" if i == self.index else ""
-            )
+        del self._items[len(texts):]
+        del self._item_texts[len(texts):]
+        for text in texts[len(self._items):]:
+            new_static = Static(text)
+            self._items.append(new_static)
+            self._item_texts.append(text)
             container.mount(new_static)
+        for i, row in enumerate(self._items):
+            row.set_class(self._window_start + i == self.index, "selected")
+        self._selected = self.index
 if __name__ == "__main__":
     if len(sys.argv) == 2:
         app = ReaderApp(sys.argv[1])